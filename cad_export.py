@@ -1,5 +1,17 @@
 import cadquery as cq
+import os
+import stat
 from pathlib import Path
+from OCP.BRepMesh import BRepMesh_IncrementalMesh
+from OCP.IFSelect import IFSelect_RetDone
+from OCP.Interface import Interface_Static
+from OCP.STEPControl import STEPControl_Writer, STEPControl_AsIs
+from OCP.StlAPI import StlAPI_Writer
+from OCP.TopLoc import TopLoc_Location
+from geometry import finalize
+
+# write buffer for STEP streams (large patterns produce multi-MB files)
+_STEP_BUFFER_SIZE = 1 << 20
 
 def _validate_step_path(filepath: str | Path, overwrite: bool = True) -> Path:
     """
@@ -20,26 +32,135 @@ def _validate_step_path(filepath: str | Path, overwrite: bool = True) -> Path:
     elif path.suffix.lower() not in {".step", ".stp"}:
         raise ValueError("File extension must be .step or .stp")
 
+    # One stat() answers both "exists" and "is a directory"
+    try:
+        st = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        st = None
+
     # Prevent directory misuse
-    if path.exists() and path.is_dir():
+    if st is not None and stat.S_ISDIR(st.st_mode):
         raise ValueError("filepath points to a directory, not a file")
 
     # Create parent directory
     path.parent.mkdir(parents=True, exist_ok=True)
 
     # Overwrite protection
-    if path.exists() and not overwrite:
+    if st is not None and not overwrite:
         raise FileExistsError(f"{path} already exists")
 
+    # Absolute paths without ".." are already usable; resolve() would readlink every component
+    if path.is_absolute() and ".." not in path.parts:
+        return path
+
     return path.resolve()
 
 
-def export_step(obj: cq.Workplane | cq.Assembly, filepath: str | Path, overwrite: bool = True) -> Path:
+def _write_step_buffered(shape: cq.Shape, path: Path) -> None:
+    """
+    Write a shape to STEP through a 1 MiB buffered file handle instead of
+    letting OCCT issue many small writes.
+    """
+    Interface_Static.SetCVal_s("xstep.cascade.unit", "MM")
+    Interface_Static.SetCVal_s("write.step.unit", "MM")
+
+    writer = STEPControl_Writer()
+    if writer.Transfer(shape.wrapped, STEPControl_AsIs) != IFSelect_RetDone:
+        raise RuntimeError("STEP transfer failed")
+
+    with open(path, "wb", buffering=_STEP_BUFFER_SIZE) as f:
+        status = writer.WriteStream(f)
+
+    if status != IFSelect_RetDone:
+        raise RuntimeError(f"STEP write failed: {path}")
+
+
+def _instanced_children(obj) -> list[tuple[cq.Shape, cq.Location]] | None:
+    """
+    Split a single-compound object into (prototype, location) pairs.
+
+    Returns None unless several solids of the compound share one TShape
+    (the layout produced by make_nrow_compound), i.e. unless instancing
+    actually saves geometry.
+    """
+    if isinstance(obj, cq.Workplane):
+        vals = obj.vals()
+        if len(vals) != 1:
+            return None
+        obj = vals[0]
+
+    if not isinstance(obj, cq.Compound):
+        return None
+
+    identity = TopLoc_Location()
+    prototypes: dict[cq.Shape, cq.Shape] = {}
+    solids = obj.Solids()
+    # preallocated and index-assigned: one entry per cell, known up front
+    children: list[tuple[cq.Shape, cq.Location]] = [None] * len(solids)
+    cast, setdefault = cq.Shape.cast, prototypes.setdefault
+    for k, s in enumerate(solids):
+        shape = s.wrapped
+        proto = cast(shape.Located(identity))
+        # equal TShapes hash alike, so every cell maps onto the first prototype
+        children[k] = (setdefault(proto, proto), cq.Location(shape.Location()))
+
+    if len(prototypes) == len(children):
+        return None
+
+    return children
+
+
+def _instanced_assembly(
+    assy: cq.Assembly, clean: bool = False, cleaned: dict | None = None
+) -> cq.Assembly:
+    """
+    Copy an assembly, turning compounds of repeated cells into sub-assemblies
+    that reference one prototype solid per TShape.
+
+    cq.Assembly's STEP exporter registers each distinct object once
+    (XCAFDoc shape label) and places every occurrence as a located
+    component, so the cube geometry is written once instead of once per cell.
+
+    With clean=True every other Workplane child is finalize()d, once per
+    object (cleaned maps id(obj) -> (obj, result); obj is kept so the id
+    cannot be reused), so shared children stay shared.
+    """
+    if cleaned is None:
+        cleaned = {}
+
+    out = cq.Assembly(loc=assy.loc, name=assy.name, color=assy.color)
+    out.metadata = assy.metadata
+
+    children = _instanced_children(assy.obj) if assy.obj is not None else None
+    if children is None:
+        obj = assy.obj
+        if clean and isinstance(obj, cq.Workplane):
+            if id(obj) not in cleaned:
+                cleaned[id(obj)] = (obj, finalize(obj))
+            obj = cleaned[id(obj)][1]
+        out.obj = obj
+    else:
+        for i, (proto, loc) in enumerate(children):
+            out.add(proto, loc=loc, name=f"{assy.name}_{i}", color=assy.color)
+
+    for child in assy.children:
+        out.add(_instanced_assembly(child, clean, cleaned))
+
+    return out
+
+
+def export_step(
+    obj: cq.Workplane | cq.Assembly,
+    filepath: str | Path,
+    overwrite: bool = True,
+    clean: bool = False,
+) -> Path:
     """
     Export a CadQuery object to STEP.
 
     - Workplane → solid STEP (single part)
-    - Assembly  → assembly STEP (instances preserved)
+    - Assembly  → assembly STEP (instances preserved; cells of a block
+      compound are written as components of one shared cube)
 
     Parameters
     ----------
@@ -49,6 +170,11 @@ def export_step(obj: cq.Workplane | cq.Assembly, filepath: str | Path, overwrite
         Output STEP path
     overwrite : bool
         Allow overwriting existing file
+    clean : bool
+        Clean (finalize()) the shapes once right before writing. The builders
+        no longer clean intermediate results by default; this is the single
+        pass for the final shape. Instanced cell compounds are left as they
+        are so they keep sharing one cube.
 
     Returns
     -------
@@ -60,12 +186,14 @@ def export_step(obj: cq.Workplane | cq.Assembly, filepath: str | Path, overwrite
 
     # Assembly export (IMPORTANT: different exporter)
     if isinstance(obj, cq.Assembly):
-        obj.export(str(path))   # uses assembly exporter
+        _instanced_assembly(obj, clean).export(str(path))   # uses assembly exporter
         return path
 
     # Solid export
     if isinstance(obj, cq.Workplane):
-        cq.exporters.export(obj, str(path), exportType="STEP")
+        if clean:
+            obj = finalize(obj)
+        _write_step_buffered(cq.Compound.makeCompound(obj.vals()), path)
         return path
 
     raise TypeError("obj must be cadquery.Workplane or cadquery.Assembly")
@@ -77,10 +205,15 @@ def export_mesh(
     tolerance: float = 0.1,
     angular_tolerance: float = 0.1,
     overwrite: bool = True,
+    parallel: bool = True,
+    relative_tolerance: bool = False,
 ) -> Path:
     """
     Export a CadQuery Assembly to a mesh format (STL or 3MF).
 
+    The compound is tessellated once up front with BRepMesh_IncrementalMesh;
+    the writers then reuse that triangulation instead of meshing again.
+
     Parameters
     ----------
     assy : cq.Assembly
@@ -93,6 +226,11 @@ def export_mesh(
         Angular deflection in radians
     overwrite : bool
         Allow overwriting existing file
+    parallel : bool
+        Tessellate faces in parallel (OCCT worker threads)
+    relative_tolerance : bool
+        If True, tolerance is scaled by the size of each edge. Default False
+        keeps an absolute deflection so small and large features mesh alike.
 
     Returns
     -------
@@ -107,18 +245,30 @@ def export_mesh(
 
     path.parent.mkdir(parents=True, exist_ok=True)
 
-    if path.suffix.lower() not in {".stl", ".3mf"}:
+    suffix = path.suffix.lower()
+    if suffix not in {".stl", ".3mf"}:
         raise ValueError("Only .stl and .3mf supported")
 
     # Convert assembly → compound solid with locations applied
     compound = assy.toCompound()
 
-    # Export mesh
-    cq.exporters.export(
-        compound,
-        str(path),
-        tolerance=tolerance,
-        angularTolerance=angular_tolerance,
+    # Mesh once (parallel); constructor runs Perform()
+    BRepMesh_IncrementalMesh(
+        compound.wrapped, tolerance, relative_tolerance, angular_tolerance, parallel
     )
 
-    return path
\ No newline at end of file
+    # Export mesh (writers pick up the existing triangulation)
+    if suffix == ".stl":
+        writer = StlAPI_Writer()
+        writer.ASCIIMode = False
+        if not writer.Write(compound.wrapped, str(path)):
+            raise RuntimeError(f"STL write failed: {path}")
+    else:
+        cq.exporters.export(
+            compound,
+            str(path),
+            tolerance=tolerance,
+            angularTolerance=angular_tolerance,
+        )
+
+    return path
@@ -1,10 +1,34 @@
 import cadquery as cq
+import functools
 import math
-from typing import Tuple
+from typing import List, Tuple
+from OCP.Bnd import Bnd_Box
+from OCP.BOPAlgo import BOPAlgo_GlueOff, BOPAlgo_GlueShift
+from OCP.BRepAlgoAPI import BRepAlgoAPI_Fuse
+from OCP.BRepPrimAPI import BRepPrimAPI_MakeBox
+from OCP.ShapeUpgrade import ShapeUpgrade_UnifySameDomain
+from OCP.TopTools import TopTools_ListOfShape
+from OCP.gp import gp_Ax1, gp_Dir, gp_Pnt, gp_Trsf
 
 
 Vector = Tuple[float, float, float]
 
+# second rotation angle for hexagonal cube corner orientation (atan(sqrt(2)) ≈ 54.7356°)
+_ALPHA_DEG = math.degrees(math.atan(math.sqrt(2)))
+
+
+def _hex_cube_corner_location() -> cq.Location:
+    """45° about Z followed by _ALPHA_DEG about X, composed into one transform."""
+    rot_z = gp_Trsf()
+    rot_z.SetRotation(gp_Ax1(gp_Pnt(0, 0, 0), gp_Dir(0, 0, 1)), math.radians(45.0))
+    rot_x = gp_Trsf()
+    rot_x.SetRotation(gp_Ax1(gp_Pnt(0, 0, 0), gp_Dir(1, 0, 0)), math.radians(_ALPHA_DEG))
+    # rot_x * rot_z applies rot_z first
+    return cq.Location(rot_x.Multiplied(rot_z))
+
+
+_HEX_LOC = _hex_cube_corner_location()
+
 
 def generate_rectangle(a: float, b: float, c: float) -> cq.Workplane:
     """
@@ -27,7 +51,45 @@ def generate_rectangle(a: float, b: float, c: float) -> cq.Workplane:
     if a <= 0 or b <= 0 or c <= 0:
         raise ValueError("All dimensions must be > 0")
 
-    return cq.Workplane("XY").box(a, b, c)
+    return cq.Workplane("XY").newObject([_make_box(a, b, c)])
+
+@functools.lru_cache(maxsize=256)
+def bbox_of(shape: cq.Shape) -> cq.BoundBox:
+    """
+    Memoized shape.BoundingBox().
+
+    cq.Shape hashes/compares by TShape + Location, so every placement of a
+    prototype gets its own entry, while repeated queries of the same
+    (immutable) prototype skip the OCCT bounding box traversal.
+    """
+    return shape.BoundingBox()
+
+@functools.lru_cache(maxsize=128)
+def _make_box(a: float, b: float, c: float) -> cq.Solid:
+    """
+    Centered box solid, built once per (a, b, c).
+
+    The solid is shared between callers: translate()/moved() return copies and
+    are safe, in-place Shape.move() on it is not.
+    """
+    return _make_aabb_box(-a / 2.0, a / 2.0, -b / 2.0, b / 2.0, -c / 2.0, c / 2.0)
+
+def _make_bound_box(
+    xmin: float, xmax: float, ymin: float, ymax: float, zmin: float, zmax: float
+) -> cq.BoundBox:
+    """cq.BoundBox from known bounds, without any shape traversal."""
+    bnd = Bnd_Box()
+    bnd.Update(xmin, ymin, zmin, xmax, ymax, zmax)
+    return cq.BoundBox(bnd)
+
+def _make_aabb_box(
+    xmin: float, xmax: float, ymin: float, ymax: float, zmin: float, zmax: float
+) -> cq.Solid:
+    """
+    Axis-aligned box built directly between its two corners, so no
+    generate_rectangle(...).translate(...) copy is needed.
+    """
+    return cq.Solid(BRepPrimAPI_MakeBox(gp_Pnt(xmin, ymin, zmin), gp_Pnt(xmax, ymax, zmax)).Solid())
 
 def rotate_shape(
     shape: cq.Workplane,
@@ -69,21 +131,15 @@ def rotate_shape(
 
 def rotate_hexagonal_cube_corner(shape: cq.Workplane) -> cq.Workplane:
     """
-    Rotate 45° about Z, then 45° about X (in that order).
+    Rotate 45° about Z, then atan(sqrt(2)) ≈ 54.7356° about X (in that order).
+
+    Both rotations are precomposed into one location (_HEX_LOC), so each
+    solid gets a single moved() instead of two rotate passes.
     """
     if not isinstance(shape, cq.Workplane):
         raise TypeError("shape must be a cadquery.Workplane")
 
-    # determine edge length and diagonal for info
-    edge_length_mm = shape.val().BoundingBox().xlen
-    face_diagonal_mm = math.sqrt(2) * shape.val().BoundingBox().xlen
-
-    # first rotate 45° around Z axis
-    shape = shape.rotate((0, 0, 0), (0, 0, 1), 45.0)
-    # define second rotation angle for hexagonal cube corner orientation
-    alpha_deg = math.degrees(math.atan(math.sqrt(2)))
-    shape = shape.rotate((0, 0, 0), (1, 0, 0), alpha_deg)
-    return shape
+    return shape.newObject([s.moved(_HEX_LOC) for s in shape.vals()])
 
 def cut_in_xy_plane_center(
     cube_rot: cq.Workplane,
@@ -91,7 +147,7 @@ def cut_in_xy_plane_center(
     z_offset: float = 0.0,
     pad_xy: float = 1.0,
     pad_z: float = 1.0,
-    clean: bool = True,
+    clean: bool = False,
 ) -> cq.Workplane:
     """
     Cut a rotated cube (or any solid) in half by an XY plane through its center,
@@ -115,7 +171,8 @@ def cut_in_xy_plane_center(
     pad_z : float
         Extra margin added to the halfspace box height.
     clean : bool
-        If True, run .clean() on the result.
+        If True, run .clean() on the result. Off by default; clean the final
+        shape once with finalize() instead.
 
     Returns
     -------
@@ -130,7 +187,7 @@ def cut_in_xy_plane_center(
         raise ValueError("pad_xy and pad_z must be >= 0")
 
     solid = cube_rot.val()
-    bb = solid.BoundingBox()
+    bb = bbox_of(solid)
 
     # Bounding box center of the solid (robust even if the solid was translated)
     cx = 0.5 * (bb.xmin + bb.xmax)
@@ -145,22 +202,27 @@ def cut_in_xy_plane_center(
     size_y = (bb.ymax - bb.ymin) + 2.0 * pad_xy
     size_z = (bb.zmax - bb.zmin) + 2.0 * pad_z
 
-    # Halfspace must extend beyond the plane in the kept direction
-    # Use a height that certainly covers the whole solid.
-    z_height = size_z * 2.0
-
+    # Halfspace spans only the kept side: from the plane to the padded AABB face.
+    # (The AABB is already the tightest axis-aligned cover of the rotated solid.)
     if keep == "top":
-        z_center = z_plane + z_height / 2.0
+        z_lo, z_hi = z_plane, bb.zmax + pad_z
     else:
-        z_center = z_plane - z_height / 2.0
+        z_lo, z_hi = bb.zmin - pad_z, z_plane
 
-    halfspace = generate_rectangle(size_x, size_y, z_height).translate((cx, cy, z_center))
+    # Plane beyond the solid on the kept side -> keep the box on the far side
+    # of the plane, so it misses the solid and the result is empty
+    if z_hi <= z_lo:
+        if keep == "top":
+            z_hi = z_lo + size_z
+        else:
+            z_lo = z_hi - size_z
 
-    result = cube_rot.intersect(halfspace)
-    if clean:
-        result = result.clean()
+    halfspace = cq.Workplane("XY").newObject([_make_aabb_box(
+        cx - 0.5 * size_x, cx + 0.5 * size_x, cy - 0.5 * size_y, cy + 0.5 * size_y, z_lo, z_hi
+    )])
 
-    return result
+    # Workplane.intersect cleans by itself; only do it when asked
+    return cube_rot.intersect(halfspace, clean=clean)
 
 import cadquery as cq
 
@@ -171,7 +233,8 @@ def cut_at_z_plane_from_top(
     keep: str = "bottom",
     pad_xy: float = 1.0,
     z_height: float | None = None,
-    clean: bool = True,
+    clean: bool = False,
+    verbose: bool = False,
 ) -> cq.Workplane:
     """
     Move the object so its top touches z=0, then cut at absolute z_plane.
@@ -195,7 +258,9 @@ def cut_at_z_plane_from_top(
     z_height : float | None
         Height of the halfspace box. If None, derived from shape height.
     clean : bool
-        Run .clean() on result.
+        Run .clean() on result. Off by default; see finalize().
+    verbose : bool
+        Print the applied z shift.
 
     Returns
     -------
@@ -209,16 +274,17 @@ def cut_at_z_plane_from_top(
         raise ValueError("keep must be 'top' or 'bottom'")
 
     solid = shape.val()
-    bb = solid.BoundingBox()
+    bb = bbox_of(solid)
 
     # --- shift so top sits at z=0 ---
     z_shift = -bb.zmax
-    print(f"Shifting shape by z={z_shift:.3f} to place top at z=0")
-    shifted = shape.translate((0, 0, z_shift))
-
-    bb = shifted.val().BoundingBox()
+    if verbose:
+        print(f"Shifting shape by z={z_shift:.3f} to place top at z=0")
+    # location-only move, the geometry itself is not copied
+    shift = cq.Location(cq.Vector(0.0, 0.0, z_shift))
+    shifted = shape.newObject([s.moved(shift) for s in shape.vals()])
 
-    # footprint
+    # footprint and z-span are unchanged by the pure z shift -> reuse bb
     size_x = (bb.xmax - bb.xmin) + 2 * pad_xy
     size_y = (bb.ymax - bb.ymin) + 2 * pad_xy
     cx = 0.5 * (bb.xmin + bb.xmax)
@@ -231,22 +297,20 @@ def cut_at_z_plane_from_top(
 
     # place halfspace
     if keep == "top":
-        z_center = z_plane + z_height / 2.0
+        z_lo, z_hi = z_plane, z_plane + z_height
     else:
-        z_center = z_plane - z_height / 2.0
-
-    halfspace = generate_rectangle(size_x, size_y, z_height).translate((cx, cy, z_center))
+        z_lo, z_hi = z_plane - z_height, z_plane
 
-    result = shifted.intersect(halfspace)
-
-    if clean:
-        result = result.clean()
+    halfspace = cq.Workplane("XY").newObject([_make_aabb_box(
+        cx - 0.5 * size_x, cx + 0.5 * size_x, cy - 0.5 * size_y, cy + 0.5 * size_y, z_lo, z_hi
+    )])
 
-    return result
+    # Workplane.intersect cleans by itself; only do it when asked
+    return shifted.intersect(halfspace, clean=clean)
 
 
 
-def unify_shapes(a: cq.Workplane, b: cq.Workplane) -> cq.Workplane:
+def unify_shapes(a: cq.Workplane, b: cq.Workplane, clean: bool = False) -> cq.Workplane:
     """
     Boolean union of two shapes.
 
@@ -256,24 +320,104 @@ def unify_shapes(a: cq.Workplane, b: cq.Workplane) -> cq.Workplane:
         First solid
     b : cadquery.Workplane
         Second solid
+    clean : bool
+        Run .clean() on the result. Off by default; see finalize().
 
     Returns
     -------
     cadquery.Workplane
         Combined solid
+
+    Notes
+    -----
+    For three or more shapes use union_many() instead of chaining this
+    function; every chained call runs a full fuse.
     """
     if not isinstance(a, cq.Workplane) or not isinstance(b, cq.Workplane):
         raise TypeError("Both inputs must be cadquery.Workplane objects")
 
-    # fuse the solids
-    result = a.union(b)
+    # fuse the solids (Workplane.union cleans by itself; only do it when asked)
+    return a.union(b, clean=clean)
+
+def finalize(shape: cq.Workplane) -> cq.Workplane:
+    """
+    Clean a finished shape once (ShapeUpgrade_UnifySameDomain).
+
+    The boolean helpers no longer clean by default, so a chain of cuts/unions
+    pays for one cleanup instead of one per step. Call this right before
+    export (important for STEP export & downstream CAD).
+    """
+    if not isinstance(shape, cq.Workplane):
+        raise TypeError("shape must be cadquery.Workplane")
+
+    return shape.clean()
+
+def union_many(shapes: List[cq.Workplane], clean: bool = True, glue: bool = False) -> cq.Workplane:
+    """
+    Boolean union of any number of shapes in a single fuse.
 
-    # clean model (important for STEP export & downstream CAD)
-    result = result.clean()
+    All solids go into one BRepAlgoAPI_Fuse (parallel, OBB pre-filtering), so
+    OCCT builds one intersection graph for all of them, and the result is
+    cleaned once at the end.
 
-    return result
+    Parameters
+    ----------
+    shapes : list[cadquery.Workplane]
+        Shapes to fuse (every object on each stack is used)
+    clean : bool
+        Run ShapeUpgrade_UnifySameDomain once on the fused result.
+    glue : bool
+        Use OCCT's gluing mode (BOPAlgo_GlueShift). Only valid if the solids
+        at most touch (shared/shifted faces) and never overlap; it skips the
+        face/face intersection work and is noticeably faster then.
 
-def add_shapes(a: cq.Workplane, b: cq.Workplane, clean: bool = False) -> cq.Workplane:
+    Returns
+    -------
+    cadquery.Workplane
+        Combined solid
+    """
+    if not shapes:
+        raise ValueError("shapes must not be empty")
+    if not all(isinstance(s, cq.Workplane) for s in shapes):
+        raise TypeError("All inputs must be cadquery.Workplane objects")
+
+    solids = [v for wp in shapes for v in wp.vals()]
+    if len(solids) == 1:
+        return cq.Workplane("XY").newObject(solids)
+
+    args = TopTools_ListOfShape()
+    args.Append(solids[0].wrapped)
+    tools = TopTools_ListOfShape()
+    for s in solids[1:]:
+        tools.Append(s.wrapped)
+
+    fuse_op = BRepAlgoAPI_Fuse()
+    fuse_op.SetArguments(args)
+    fuse_op.SetTools(tools)
+    fuse_op.SetRunParallel(True)
+    fuse_op.SetUseOBB(True)
+    fuse_op.SetGlue(BOPAlgo_GlueShift if glue else BOPAlgo_GlueOff)
+    fuse_op.Build()
+    if not fuse_op.IsDone():
+        raise RuntimeError("Fusing the shapes failed")
+
+    fused = fuse_op.Shape()
+
+    # one cleanup pass for the whole union
+    if clean:
+        upgrader = ShapeUpgrade_UnifySameDomain(fused, True, True, True)
+        upgrader.AllowInternalEdges(False)
+        upgrader.Build()
+        fused = upgrader.Shape()
+
+    return cq.Workplane("XY").newObject([cq.Shape.cast(fused)])
+
+def add_shapes(
+    a: cq.Workplane,
+    b: cq.Workplane,
+    clean: bool = False,
+    as_compound: bool = False,
+) -> cq.Workplane | cq.Compound:
     """
     Combine two shapes without boolean fusion (keeps separate solids).
 
@@ -283,15 +427,22 @@ def add_shapes(a: cq.Workplane, b: cq.Workplane, clean: bool = False) -> cq.Work
         Shapes to combine (no union/fuse).
     clean : bool
         Optional cleanup (usually not needed for a simple compound).
+        Ignored when as_compound is True.
+    as_compound : bool
+        Return a bare cq.Compound instead of a Workplane. Cheaper for
+        export-only callers that don't chain further Workplane operations.
 
     Returns
     -------
-    cq.Workplane
-        Workplane containing both solids as a compound.
+    cq.Workplane | cq.Compound
+        Workplane containing both solids as a compound, or the compound itself.
     """
     if not isinstance(a, cq.Workplane) or not isinstance(b, cq.Workplane):
         raise TypeError("Both inputs must be cadquery.Workplane")
 
+    if as_compound:
+        return cq.Compound.makeCompound([*a.vals(), *b.vals()])
+
     solids = []
     solids.extend(a.objects)
     solids.extend(b.objects)
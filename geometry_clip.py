@@ -1,100 +1,202 @@
 import cadquery as cq
-from geometry import generate_rectangle
-from pattern_assembly import make_nrow_compound
-from dataclasses import dataclass
-
-
-@dataclass(frozen=True)
-class PatternBBox:
-    xmin: float
-    xmax: float
-    ymin: float
-    ymax: float
-
-def pattern_bounding_box_xy(nx: int, ny: int, dx: float, dy: float, dx0: float = 0.0) -> PatternBBox:
-    if nx <= 0 or ny <= 0:
-        raise ValueError("nx and ny must be > 0")
-    if dx <= 0 or dy <= 0:
-        raise ValueError("dx and dy must be > 0")
-
-    x0 = 0.0
-    x1 = (nx - 1) * dx
-
-    if ny >= 2:
-        x0_odd = dx0
-        x1_odd = (nx - 1) * dx + dx0
-        xmin = min(x0, x0_odd)
-        xmax = max(x1, x1_odd)
-    else:
-        xmin, xmax = x0, x1
-
-    ymin = 0.0
-    ymax = (ny - 1) * dy
-
-    return PatternBBox(xmin, xmax, ymin, ymax)
+import functools
+import numpy as np
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from OCP.BRep import BRep_Builder
+from OCP.BRepAlgoAPI import BRepAlgoAPI_Common
+from OCP.TopoDS import TopoDS_Compound
+from geometry import _make_aabb_box, _make_bound_box, bbox_of
+from pattern_assembly import (
+    _IDENTITY_LOC, PatternBBox, PatternParams, _grid_xy, _make_nrow_compound_fast, _record_bbox,
+    _y_shift_loc,
+)
+from typing import List, NamedTuple, Tuple
+
+try:  # optional: JIT-compiled cell classifier
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def pattern_bounding_box_xy(pattern: PatternParams) -> PatternBBox:
+    if not isinstance(pattern, PatternParams):
+        raise TypeError("pattern must be PatternParams")
+    return pattern.bbox
 
 
 def make_bounding_box_solid(
-    nx: int,
-    ny: int,
-    dx: float,
-    dy: float,
-    dx0: float = 0.0,
+    pattern: PatternParams,
     margin_x: float = 0.0,
     margin_y: float = 0.0,
     z_height: float = 10000.0,
     z_center: float = 0.0,
 ) -> cq.Workplane:
     """
-    Bounding box solid using generate_rectangle()
+    Bounding box solid (axis-aligned box around the pattern plus margins)
     """
+    box = _bounding_box_shape(pattern, margin_x, margin_y, z_height, z_center)
 
-    bb = pattern_bounding_box_xy(nx, ny, dx, dy, dx0)
+    # fresh Workplane around the cached solid (Workplane.add mutates in place)
+    return cq.Workplane("XY").newObject([box])
+
+def _bounding_box_xy(
+    pattern: PatternParams,
+    margin_x: float,
+    margin_y: float,
+) -> Tuple[float, float, float, float]:
+    """(center_x, center_y, size_x, size_y) of the bounding box solid."""
+    bb = pattern_bounding_box_xy(pattern)
 
     size_x = (bb.xmax - bb.xmin) + 2 * margin_x
     size_y = (bb.ymax - bb.ymin) + 2 * margin_y
 
-    if size_x <= 0 or size_y <= 0 or z_height <= 0:
+    if size_x <= 0 or size_y <= 0:
         raise ValueError("Invalid bounding box dimensions")
 
-    center_x = 0.5 * (bb.xmin + bb.xmax)
-    center_y = 0.5 * (bb.ymin + bb.ymax)
+    return 0.5 * (bb.xmin + bb.xmax), 0.5 * (bb.ymin + bb.ymax), size_x, size_y
 
-    box = generate_rectangle(size_x, size_y, z_height)
-    box = box.translate((center_x, center_y, z_center))
+@functools.lru_cache(maxsize=32)
+def _bounding_box_shape(
+    pattern: PatternParams,
+    margin_x: float,
+    margin_y: float,
+    z_height: float,
+    z_center: float,
+) -> cq.Shape:
+    """
+    Memoized solid behind make_bounding_box_solid; repeated clip/substrate
+    calls with the same pattern share one OCCT box.
+    """
+    center_x, center_y, size_x, size_y = _bounding_box_xy(pattern, margin_x, margin_y)
+    if z_height <= 0:
+        raise ValueError("Invalid bounding box dimensions")
 
-    return box
+    return _make_aabb_box(
+        center_x - 0.5 * size_x, center_x + 0.5 * size_x,
+        center_y - 0.5 * size_y, center_y + 0.5 * size_y,
+        z_center - 0.5 * z_height, z_center + 0.5 * z_height,
+    )
 
-def _bbox_contains(bb_outer: cq.BoundBox, bb_inner: cq.BoundBox) -> bool:
+class ShiftedBBox(NamedTuple):
+    """Plain AABB (same attribute names as cq.BoundBox) of a prototype shifted in Y."""
+    xmin: float
+    xmax: float
+    ymin: float
+    ymax: float
+    zmin: float
+    zmax: float
+
+def _xy_contains(bb_outer: cq.BoundBox | ShiftedBBox, bb_inner: cq.BoundBox | ShiftedBBox) -> bool:
+    """XY part of an AABB containment test; the shared z range is tested once by the caller."""
     return (
         bb_inner.xmin >= bb_outer.xmin and bb_inner.xmax <= bb_outer.xmax and
-        bb_inner.ymin >= bb_outer.ymin and bb_inner.ymax <= bb_outer.ymax and
-        bb_inner.zmin >= bb_outer.zmin and bb_inner.zmax <= bb_outer.zmax
+        bb_inner.ymin >= bb_outer.ymin and bb_inner.ymax <= bb_outer.ymax
     )
 
-def _bbox_intersects(a: cq.BoundBox, b: cq.BoundBox) -> bool:
+def _xy_intersects(a: cq.BoundBox | ShiftedBBox, b: cq.BoundBox | ShiftedBBox) -> bool:
+    """XY part of an AABB overlap test (separating axes, x first)."""
     return not (
         a.xmax < b.xmin or a.xmin > b.xmax or
-        a.ymax < b.ymin or a.ymin > b.ymax or
-        a.zmax < b.zmin or a.zmin > b.zmax
+        a.ymax < b.ymin or a.ymin > b.ymax
     )
 
+_CELL_OUTSIDE, _CELL_INSIDE, _CELL_BOUNDARY = 0, 1, 2
+
+def _classify_cells_np(xs, ys, cell_bb, clip_bb, z_inside, z_hit):
+    """
+    Classify every cell (base AABB cell_bb placed at xs[k], ys[k]) against the
+    clip AABB: _CELL_OUTSIDE / _CELL_INSIDE / _CELL_BOUNDARY as a uint8 array.
+    Same tests as _xy_contains / _xy_intersects; z is passed in as scalars
+    because it is the same for every cell.
+    """
+    cxmin, cxmax, cymin, cymax = cell_bb
+    bxmin, bxmax, bymin, bymax = clip_bb
+    x0 = xs + cxmin
+    x1 = xs + cxmax
+    y0 = ys + cymin
+    y1 = ys + cymax
+
+    inside = (x0 >= bxmin) & (x1 <= bxmax) & (y0 >= bymin) & (y1 <= bymax) & z_inside
+    hit = ~((x1 < bxmin) | (x0 > bxmax) | (y1 < bymin) | (y0 > bymax)) & z_hit
+
+    state = np.where(hit, _CELL_BOUNDARY, _CELL_OUTSIDE).astype(np.uint8)
+    state[inside] = _CELL_INSIDE
+    return state
+
+def _classify_cells_loop(xs, ys, cell_bb, clip_bb, z_inside, z_hit):
+    """Loop form of _classify_cells_np, compiled with numba when available."""
+    cxmin, cxmax, cymin, cymax = cell_bb
+    bxmin, bxmax, bymin, bymax = clip_bb
+    n = xs.shape[0]
+    state = np.zeros(n, dtype=np.uint8)
+    if not z_hit:
+        return state
+    for k in range(n):
+        x0 = xs[k] + cxmin
+        x1 = xs[k] + cxmax
+        y0 = ys[k] + cymin
+        y1 = ys[k] + cymax
+        if x1 < bxmin or x0 > bxmax or y1 < bymin or y0 > bymax:
+            continue
+        if z_inside and x0 >= bxmin and x1 <= bxmax and y0 >= bymin and y1 <= bymax:
+            state[k] = _CELL_INSIDE
+        else:
+            state[k] = _CELL_BOUNDARY
+    return state
+
+if njit is not None:
+    # serial on purpose: numba worker threads + the fork in ProcessPoolExecutor deadlock
+    _classify_cells = njit(cache=True)(_classify_cells_loop)
+else:
+    _classify_cells = _classify_cells_np
+
+def _intersect_cells(cells: List[cq.Shape], bbox: cq.Shape, clean: bool) -> cq.Shape:
+    """
+    Intersect every placed cell with the clipping solid on its own (one
+    BRepAlgoAPI_Common per cell, so overlapping cells are never cut against
+    each other) and collect the results in one compound.
+    Module level so it can run in a worker process (cq.Shape pickles via BinTools);
+    the result does not depend on how the cells are chunked.
+    """
+    tool = bbox.wrapped
+    builder = BRep_Builder()
+    comp = TopoDS_Compound()
+    builder.MakeCompound(comp)
+
+    for cell in cells:
+        common_op = BRepAlgoAPI_Common(cell.wrapped, tool)
+        if not common_op.IsDone():
+            raise RuntimeError("Clipping the boundary cells failed")
+        clipped = cq.Shape.cast(common_op.Shape())
+        if clean:
+            clipped = clipped.clean()
+        builder.Add(comp, clipped.wrapped)
+
+    return cq.Compound(comp)
+
 def clip_pattern_assembly_by_bbox(
     cube: cq.Workplane,
-    nx: int,
-    ny: int,
-    dx: float,
-    dy: float,
-    dx0: float = 0.0,
+    pattern: PatternParams,
     block_rows: int = 4,
     margin_x: float = 0.0,
     margin_y: float = 0.0,
     z_height: float = 10_000.0,
     z_center: float = 0.0,
-    clean_clipped: bool = True,
+    clean_clipped: bool = False,
     verbose: bool = False,
+    workers: int | None = 1,
 ) -> Tuple[cq.Assembly, cq.Workplane]:
     """
+    Blocks fully inside the clip box are instanced, blocks outside are dropped.
+    Inside a straddling block every cell is classified by its analytic AABB, so
+    only the cells that actually cross the box are intersected, each on its own
+    (overlapping cells are not cut against each other), and gathered into one
+    "boundary_clipped" child. With workers > 1 (None = os.cpu_count()) the
+    crossing cells are split into contiguous chunks that are intersected in a
+    process pool; the result is the same for any worker count.
+
     Returns
     -------
     (cq.Assembly, cq.Workplane)
@@ -102,33 +204,56 @@ def clip_pattern_assembly_by_bbox(
     """
     if not isinstance(cube, cq.Workplane):
         raise TypeError("cube must be cadquery.Workplane")
-    if nx <= 0 or ny <= 0:
-        raise ValueError("nx and ny must be > 0")
-    if dx <= 0 or dy <= 0:
-        raise ValueError("dx and dy must be > 0")
+    if not isinstance(pattern, PatternParams):
+        raise TypeError("pattern must be PatternParams")
+    nx, ny, dx, dy, dx0 = pattern.nx, pattern.ny, pattern.dx, pattern.dy, pattern.dx0
     if not (1 <= block_rows < ny):
         raise ValueError("block_rows must satisfy 1 <= block_rows < ny")
     if z_height <= 0:
         raise ValueError("z_height must be > 0")
-
-    # --- clipping solid (Workplane) and its AABB ---
-    bbox_wp = make_bounding_box_solid(
-        nx=nx, ny=ny, dx=dx, dy=dy, dx0=dx0,
-        margin_x=margin_x, margin_y=margin_y,
-        z_height=z_height, z_center=z_center,
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be >= 1")
+
+    # --- AABB of the clipping box from plain floats (the solid is built later) ---
+    center_x, center_y, size_x, size_y = _bounding_box_xy(pattern, margin_x, margin_y)
+    bbox_bb = ShiftedBBox(
+        center_x - 0.5 * size_x, center_x + 0.5 * size_x,
+        center_y - 0.5 * size_y, center_y + 0.5 * size_y,
+        z_center - 0.5 * z_height, z_center + 0.5 * z_height,
     )
-    bbox_bb = bbox_wp.val().BoundingBox()
 
-    # --- build reusable block prototypes once (no union inside) ---
-    block_even = make_nrow_compound(
-        cube=cube, nx=nx, nrows=block_rows, dx=dx, dy=dy, dx0=dx0, row_start_parity=0
-    )
-    block_odd = make_nrow_compound(
-        cube=cube, nx=nx, nrows=block_rows, dx=dx, dy=dy, dx0=dx0, row_start_parity=1
-    )
+    # --- reusable block prototypes (no union inside), built on first use, so
+    # a parity whose blocks all lie outside the clip box is never built ---
+    blocks: List[cq.Workplane | None] = [None, None]
+    base = cube.val()  # resolved once for every prototype below
+
+    def _block(parity: int) -> cq.Workplane:
+        if blocks[parity] is None:
+            blocks[parity] = _make_nrow_compound_fast(base, nx, block_rows, dx, dy, dx0, parity)
+        return blocks[parity]
+
+    # cell AABB = base cube AABB + cell placement; block AABBs follow from the
+    # extreme placements, so neither cells nor blocks need an OCCT bbox query
+    base_bb = bbox_of(base)
+
+    # z extent is the same for every cell and block -> test it once
+    z_inside = base_bb.zmin >= bbox_bb.zmin and base_bb.zmax <= bbox_bb.zmax
+    z_hit = not (base_bb.zmax < bbox_bb.zmin or base_bb.zmin > bbox_bb.zmax)
+    cells_even = _grid_xy(nx, block_rows, dx, dy, dx0, 0)
+    cells_odd = _grid_xy(nx, block_rows, dx, dy, dx0, 1)
+
+    def _cells_bb(cell_xy) -> ShiftedBBox:
+        xs, ys = cell_xy
+        return ShiftedBBox(
+            base_bb.xmin + float(xs.min()), base_bb.xmax + float(xs.max()),
+            base_bb.ymin + float(ys.min()), base_bb.ymax + float(ys.max()),
+            base_bb.zmin, base_bb.zmax,
+        )
 
-    bb_even = block_even.val().BoundingBox()
-    bb_odd = block_odd.val().BoundingBox()
+    bb_even = _cells_bb(cells_even)
+    bb_odd = _cells_bb(cells_odd)
 
     out = cq.Assembly(name="pattern_clipped")
 
@@ -137,67 +262,157 @@ def clip_pattern_assembly_by_bbox(
 
     kept = clipped = dropped = 0
 
-    def _shifted_bb(bb: cq.BoundBox, dy_off: float):
-        class _BB:
-            xmin = bb.xmin
-            xmax = bb.xmax
-            ymin = bb.ymin + dy_off
-            ymax = bb.ymax + dy_off
-            zmin = bb.zmin
-            zmax = bb.zmax
-        return _BB()  # lightweight with same attributes
+    # straddling blocks: (assembly name, compound of the cells inside or None,
+    # cells crossing the box, y offset)
+    clip_jobs: List[Tuple[str, cq.Compound | None, List[cq.Shape], float]] = []
+
+    def _shifted_bb(bb: cq.BoundBox | ShiftedBBox, dy_off: float) -> ShiftedBBox:
+        return ShiftedBBox(bb.xmin, bb.xmax, bb.ymin + dy_off, bb.ymax + dy_off, bb.zmin, bb.zmax)
+
+    builder = BRep_Builder()
+
+    def _split_cells(cells: List[cq.Shape], cell_xy, y_off: float):
+        """
+        (inside, straddling) cells of a block placed at y_off; outside cells are dropped.
+        cells[k] sits at cell_xy[0][k], cell_xy[1][k] (parallel arrays). The inside
+        cells are streamed into one TopoDS_Compound (None if there are none).
+        """
+        xs, ys = cell_xy
+
+        state = _classify_cells(
+            xs, ys,
+            (base_bb.xmin, base_bb.xmax, base_bb.ymin + y_off, base_bb.ymax + y_off),
+            (bbox_bb.xmin, bbox_bb.xmax, bbox_bb.ymin, bbox_bb.ymax),
+            z_inside, z_hit,
+        )
+
+        inside_idx = np.flatnonzero(state == _CELL_INSIDE).tolist()
+        inside = None
+        if inside_idx:
+            comp = TopoDS_Compound()
+            builder.MakeCompound(comp)
+            for k in inside_idx:
+                builder.Add(comp, cells[k].wrapped)
+            inside = cq.Compound(comp)
+
+        return inside, [cells[k] for k in np.flatnonzero(state == _CELL_BOUNDARY).tolist()]
+
+    # start_row parity of every block, computed once
+    odd_start = ((np.arange(full_blocks) * block_rows) & 1).astype(bool).tolist()
+
+    # cell shapes of the even/odd prototype, unpacked from the compound on first use
+    block_cells: List[List[cq.Shape] | None] = [None, None]
 
     for b in range(full_blocks):
         start_row = b * block_rows
         y_off = start_row * dy
 
-        use_odd = (start_row & 1) == 1
-        block_wp = block_odd if use_odd else block_even
+        use_odd = odd_start[b]
         block_bb0 = bb_odd if use_odd else bb_even
         block_bb = _shifted_bb(block_bb0, y_off)
 
-        if _bbox_contains(bbox_bb, block_bb):
-            out.add(block_wp, name=f"block_{b}", loc=cq.Location(cq.Vector(0.0, y_off, 0.0)))
-            kept += 1
-            continue
-
-        if not _bbox_intersects(bbox_bb, block_bb):
+        if not (z_hit and _xy_intersects(bbox_bb, block_bb)):
             dropped += 1
             continue
 
-        placed = block_wp.translate((0.0, y_off, 0.0))
-        clipped_wp = placed.intersect(bbox_wp)
-        if clean_clipped:
-            clipped_wp = clipped_wp.clean()
+        block_wp = _block(use_odd)
+        if z_inside and _xy_contains(bbox_bb, block_bb):
+            out.add(block_wp, name=f"block_{b}", loc=_y_shift_loc(y_off))
+            kept += 1
+            continue
 
-        out.add(clipped_wp, name=f"block_{b}_clipped", loc=cq.Location())
-        clipped += 1
+        if block_cells[use_odd] is None:
+            block_cells[use_odd] = block_wp.val().Solids()
+        inside, straddling = _split_cells(
+            block_cells[use_odd], cells_odd if use_odd else cells_even, y_off
+        )
+        clip_jobs.append((f"block_{b}_clipped", inside, straddling, y_off))
 
     if rem:
         start_row = full_blocks * block_rows
         y_off = start_row * dy
         parity = start_row & 1
 
-        tail = make_nrow_compound(
-            cube=cube, nx=nx, nrows=rem, dx=dx, dy=dy, dx0=dx0, row_start_parity=parity
-        )
-        tail_bb0 = tail.val().BoundingBox()
-        tail_bb = _shifted_bb(tail_bb0, y_off)
+        tail_cells = _grid_xy(nx, rem, dx, dy, dx0, parity)
+        tail_bb = _shifted_bb(_cells_bb(tail_cells), y_off)
 
-        if _bbox_contains(bbox_bb, tail_bb):
-            out.add(tail, name="tail", loc=cq.Location(cq.Vector(0.0, y_off, 0.0)))
-            kept += 1
-        elif not _bbox_intersects(bbox_bb, tail_bb):
+        if not (z_hit and _xy_intersects(bbox_bb, tail_bb)):
             dropped += 1
         else:
-            placed = tail.translate((0.0, y_off, 0.0))
-            clipped_wp = placed.intersect(bbox_wp)
-            if clean_clipped:
-                clipped_wp = clipped_wp.clean()
-            out.add(clipped_wp, name="tail_clipped", loc=cq.Location())
-            clipped += 1
+            # only build the tail geometry once it is known to be needed
+            tail = _make_nrow_compound_fast(base, nx, rem, dx, dy, dx0, parity)
+            if z_inside and _xy_contains(bbox_bb, tail_bb):
+                out.add(tail, name="tail", loc=_y_shift_loc(y_off))
+                kept += 1
+            else:
+                inside, straddling = _split_cells(tail.val().Solids(), tail_cells, y_off)
+                clip_jobs.append(("tail_clipped", inside, straddling, y_off))
+
+    # --- clipping solid: needed for the booleans and as the second return value ---
+    bbox_wp = make_bounding_box_solid(
+        pattern,
+        margin_x=margin_x, margin_y=margin_y,
+        z_height=z_height, z_center=z_center,
+    )
+    bbox_solid = bbox_wp.val()
+
+    # --- intersect the straddling cells (one boolean per cell, chunked per worker) ---
+    # one Location per block, shared by all of its cells
+    job_locs = [_y_shift_loc(job[3]) for job in clip_jobs]
+    placed = [
+        cell.moved(loc)
+        for (_, _, straddling, _), loc in zip(clip_jobs, job_locs)
+        for cell in straddling
+    ]
+
+    n_chunks = min(workers, len(placed))
+    if n_chunks > 1:
+        # contiguous chunks, one per worker
+        bounds = np.linspace(0, len(placed), n_chunks + 1).astype(int).tolist()
+        chunks = [placed[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+        with ProcessPoolExecutor(max_workers=n_chunks) as ex:
+            boundary = list(ex.map(
+                _intersect_cells, chunks, repeat(bbox_solid), repeat(clean_clipped)
+            ))
+    elif placed:
+        boundary = [_intersect_cells(placed, bbox_solid, clean_clipped)]
+    else:
+        boundary = []
+
+    for (name, inside, straddling, _), loc in zip(clip_jobs, job_locs):
+        if inside is None and not straddling:
+            dropped += 1
+            continue
+        clipped += 1
+
+        if inside is not None:
+            # placed by the assembly node like a kept block; the cells stay untouched
+            out.add(cq.Workplane("XY").newObject([inside]), name=name, loc=loc)
+
+    if len(boundary) > 1:
+        # chunk results from the pool -> one flat compound of clipped cells,
+        # the same shape the serial path builds
+        comp = TopoDS_Compound()
+        builder.MakeCompound(comp)
+        for chunk in boundary:
+            for shape in chunk:
+                builder.Add(comp, shape.wrapped)
+        boundary = [cq.Compound(comp)]
+    if boundary:
+        out.add(cq.Workplane("XY").newObject(boundary), name="boundary_clipped", loc=_IDENTITY_LOC)
+
+    # Uncut cells keep the prototype's full z range, and nothing reaches past the
+    # clip box in XY -> record an enclosing bbox for assembly_bbox/assembly_zmin
+    if z_inside and (kept or any(job[1] is not None for job in clip_jobs)):
+        pat_bb = pattern.bbox
+        out.metadata["pattern_bbox"] = _make_bound_box(
+            max(pat_bb.xmin + base_bb.xmin, bbox_bb.xmin), min(pat_bb.xmax + base_bb.xmax, bbox_bb.xmax),
+            max(pat_bb.ymin + base_bb.ymin, bbox_bb.ymin), min(pat_bb.ymax + base_bb.ymax, bbox_bb.ymax),
+            base_bb.zmin, base_bb.zmax,
+        )
+        _record_bbox(out, out.metadata["pattern_bbox"])
 
     if verbose:
         print(f"[assy-clip] kept={kept}, clipped={clipped}, dropped={dropped}")
 
-    return out, bbox_wp
\ No newline at end of file
+    return out, bbox_wp
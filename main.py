@@ -3,7 +3,7 @@ import time
 
 from geometry import generate_rectangle, rotate_hexagonal_cube_corner, cut_at_z_plane_from_top
 from geometry_clip import clip_pattern_assembly_by_bbox
-from pattern_assembly import make_pattern_assembly, add_substrate, add_frame_around_pattern
+from pattern_assembly import PatternParams, make_pattern_assembly, add_substrate, add_frame_around_pattern
 from cad_export import export_step, export_mesh
 
 # SETTINGS
@@ -27,6 +27,8 @@ y_sep_mm = math.sqrt(math.pow(edge_length_mm, 2) + math.pow(face_diagonal_mm / 2
 x_offset_mm = 0.5 * math.sqrt(2) * edge_length_mm   # applied to every second row
 # define second rotation angle for hexagonal cube corner orientation
 alpha_deg = math.degrees(math.atan(math.sqrt(2)))
+# pattern layout shared by the pattern, substrate and frame
+pattern = PatternParams(nx=nx, ny=ny, dx=x_sep_mm, dy=y_sep_mm, dx0=x_offset_mm)
 
 
 # generate cube as unit cell
@@ -50,13 +52,9 @@ print(f"Generating the pattern...")
 
 # mage the pattern of cubes as an assembly by instancing a 4-row compound,
 # which reduces the number of assembly elements and keeps 'no union' behavior
-assy=clip_pattern_assembly_by_bbox(
+assy, _ = clip_pattern_assembly_by_bbox(
     cube=cube_rot_cut,
-    nx=nx,
-    ny=ny,
-    dx=x_sep_mm,
-    dy=y_sep_mm,
-    dx0=x_offset_mm,
+    pattern=pattern,
     block_rows=block_rows,  # n
 )
 # Runtime measurement
@@ -69,11 +67,7 @@ assy = add_substrate(
     assy=assy,
     thickness=substrate_thickness_mm,        # substrate thickness [mm]
     margin=substrate_margin_mm,           # extra border around pattern [mm]
-    nx=nx,
-    ny=ny,
-    dx=x_sep_mm,
-    dy=y_sep_mm,
-    dx0=x_offset_mm,
+    pattern=pattern,
     edge_length_mm=edge_length_mm,   # cube edge length
 )
 
@@ -81,11 +75,7 @@ assy = add_frame_around_pattern(
     assy,
     substrate_thickness=substrate_thickness_mm,
     margin=substrate_margin_mm,
-    nx=nx,
-    ny=ny,
-    dx=x_sep_mm,
-    dy=y_sep_mm,
-    dx0=x_offset_mm,
+    pattern=pattern,
     edge_length_mm=edge_length_mm,
     clearance=0.0,   # optional opening clearance
 )
@@ -1,9 +1,86 @@
 import cadquery as cq
-from typing import List
-from geometry import generate_rectangle
+import functools
+import numpy as np
+from dataclasses import dataclass
+from typing import List, Tuple
+from OCP.BRep import BRep_Builder
+from OCP.TopLoc import TopLoc_Location
+from OCP.TopoDS import TopoDS_Compound, TopoDS_Shape
+from OCP.gp import gp_Trsf, gp_Vec
+from geometry import _make_aabb_box, _make_bound_box, bbox_of, union_many
+
+# identity placement shared by every child added at the origin; Assembly only
+# ever reassigns .loc, never mutates it, so one instance is safe to reuse
+_IDENTITY_LOC = cq.Location()
+
+
+@dataclass(frozen=True)
+class PatternBBox:
+    xmin: float
+    xmax: float
+    ymin: float
+    ymax: float
+
+@dataclass(frozen=True)
+class PatternParams:
+    """
+    Staggered pattern of nx x ny cells: dx apart within a row, dy between rows,
+    every second row shifted by dx0.
+
+    Frozen and hashable, so it can be passed around as one value and used as a
+    cache key; derived quantities are computed once per instance.
+    """
+    nx: int
+    ny: int
+    dx: float
+    dy: float
+    dx0: float = 0.0
+
+    def __post_init__(self):
+        if self.nx <= 0 or self.ny <= 0:
+            raise ValueError("nx and ny must be > 0")
+        if self.dx <= 0 or self.dy <= 0:
+            raise ValueError("dx and dy must be > 0")
+
+    @functools.cached_property
+    def bbox(self) -> PatternBBox:
+        """XY bounds of the cell centers (placement points)."""
+        # Only the first and last centers of an even and an odd row matter
+        stagger = self.dx0 if self.ny >= 2 else 0.0
+        return PatternBBox(
+            min(0.0, stagger),
+            (self.nx - 1) * self.dx + max(0.0, stagger),
+            0.0,
+            (self.ny - 1) * self.dy,
+        )
+
+@functools.lru_cache(maxsize=64)
+def _grid_xy(
+    nx: int,
+    nrows: int,
+    dx: float,
+    dy: float,
+    dx0: float = 0.0,
+    row_start_parity: int = 0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Placement points of a staggered grid as flat (x, y) arrays, row by row.
+    Every row with odd (row_start_parity + r) is shifted by dx0.
+
+    Memoized: the clip classifier asks for the same grids block after block
+    and _nrow_compound takes its row coordinates from here, so the arrays are
+    shared and therefore returned read-only.
+    """
+    rows = np.arange(nrows)
+    row_off = np.where((rows + row_start_parity) & 1, dx0, 0.0)
+    xs = (np.arange(nx) * dx + row_off[:, None]).ravel()
+    ys = np.broadcast_to((rows * dy)[:, None], (nrows, nx)).ravel()
+    xs.flags.writeable = False
+    ys.flags.writeable = False
+    return xs, ys
 
 def make_nrow_compound(
-    cube: cq.Workplane,
+    cube: cq.Workplane | cq.Shape,
     nx: int,
     nrows: int,
     dx: float,
@@ -13,12 +90,23 @@ def make_nrow_compound(
 ) -> cq.Workplane:
     """
     nrows rows as one compound (no union), with stagger.
+
+    The compound is filled directly with BRep_Builder; every cell is the base
+    shape Moved by a TopLoc_Location, so all cells share the base TShape.
+    .Solids() of the returned compound yields the cells in row-major order.
+    Repeated calls with the same cube and layout reuse the cached compound.
+
+    cube:
+        Workplane holding the prototype, or the prototype cq.Shape itself
+        (callers placing several blocks resolve cube.val() once)
     row_start_parity:
         0 -> first row has x_off = 0
         1 -> first row has x_off = dx0
     """
-    if not isinstance(cube, cq.Workplane):
-        raise TypeError("cube must be cadquery.Workplane")
+    if isinstance(cube, cq.Workplane):
+        cube = cube.val()
+    if not isinstance(cube, cq.Shape):
+        raise TypeError("cube must be cadquery.Workplane or cadquery.Shape")
     if nx <= 0 or nrows <= 0:
         raise ValueError("nx and nrows must be > 0")
     if dx <= 0 or dy <= 0:
@@ -26,19 +114,96 @@ def make_nrow_compound(
     if row_start_parity not in (0, 1):
         raise ValueError("row_start_parity must be 0 or 1")
 
-    base = cube.val()
-    solids: List[cq.Shape] = []
+    return _make_nrow_compound_fast(cube, nx, nrows, dx, dy, dx0, row_start_parity)
 
-    # Tight loop; avoid extra work
+def _make_nrow_compound_fast(
+    base: cq.Shape,
+    nx: int,
+    nrows: int,
+    dx: float,
+    dy: float,
+    dx0: float = 0.0,
+    row_start_parity: int = 0,
+) -> cq.Workplane:
+    """
+    make_nrow_compound without argument checks, for callers that validated
+    already (PatternParams does so on construction). Takes the resolved
+    prototype shape, not the Workplane.
+    """
+    comp = _nrow_compound(base, nx, nrows, dx, dy, dx0, row_start_parity)
+
+    # fresh Workplane around the cached compound (Workplane.add mutates in place)
+    return cq.Workplane("XY").newObject([comp])
+
+@functools.lru_cache(maxsize=32)
+def _nrow_compound(
+    base: cq.Shape,
+    nx: int,
+    nrows: int,
+    dx: float,
+    dy: float,
+    dx0: float,
+    row_start_parity: int,
+) -> cq.Compound:
+    """
+    Memoized compound behind make_nrow_compound. cq.Shape hashes by TShape +
+    Location, so the key follows the prototype geometry, not the Workplane.
+    The compound is shared: moved() is safe, in-place Shape.move() is not.
+
+    The compound nests one row compound per row; use .Solids() for the cells.
+    """
+    # two row prototypes (x offsets 0 and dx0); every row is one moved reference.
+    # Row x coordinates come from the memoized _grid_xy, so cells sit exactly
+    # where the clip classifier expects them.
+    row_even = _row_compound(base.wrapped, _grid_xy(nx, 1, dx, dy, dx0, 0)[0])
+    row_odd = None
+    if nrows > 1 or row_start_parity:
+        row_odd = _row_compound(base.wrapped, _grid_xy(nx, 1, dx, dy, dx0, 1)[0])
+
+    builder = BRep_Builder()
+    comp = TopoDS_Compound()
+    builder.MakeCompound(comp)
+    trsf = gp_Trsf()
+    # Moved() rather than BRepBuilderAPI_Transform(row, trsf, False): for a pure
+    # translation both only attach a TopLoc_Location, Moved without the
+    # builder object (~1.4 us vs ~2.1 us per row)
     for r in range(nrows):
-        y = r * dy
-        x_off = dx0 if ((row_start_parity + r) & 1) else 0.0
+        row = row_odd if (row_start_parity + r) & 1 else row_even
+        trsf.SetTranslation(gp_Vec(0.0, r * dy, 0.0))
+        builder.Add(comp, row.Moved(TopLoc_Location(trsf)))
 
-        for i in range(nx):
-            x = i * dx + x_off
-            solids.append(base.moved(cq.Location(cq.Vector(x, y, 0.0))))
+    return cq.Compound(comp)
 
-    return cq.Workplane("XY").newObject(solids)
+def _y_shift_loc(y: float) -> cq.Location:
+    """
+    Placement of a block instance: a pure y translation, built straight from
+    gp_Trsf/TopLoc_Location (no cq.Vector). Blocks stay located instances of
+    the shared prototype; OCCT composes this with the per-cell locations of
+    the compound in C++ (toCompound, STEP export), so never flatten blocks.
+    """
+    trsf = gp_Trsf()
+    trsf.SetTranslation(gp_Vec(0.0, y, 0.0))
+    return cq.Location(TopLoc_Location(trsf))
+
+def _row_compound(shape: TopoDS_Shape, xs: np.ndarray) -> TopoDS_Compound:
+    """
+    One row of moved copies of shape, one per x in xs, at y = 0.
+    """
+    builder = BRep_Builder()
+    comp = TopoDS_Compound()
+    builder.MakeCompound(comp)
+    trsf = gp_Trsf()
+
+    # hot loop: bind the bound methods/classes once instead of per cell
+    set_translation = trsf.SetTranslation
+    add = builder.Add
+    moved = shape.Moved
+    vec, loc = gp_Vec, TopLoc_Location
+    for x in xs.tolist():
+        set_translation(vec(x, 0.0, 0.0))
+        add(comp, moved(loc(trsf)))
+
+    return comp
 
 def make_nrow_union(
     cube: cq.Workplane,
@@ -48,14 +213,23 @@ def make_nrow_union(
     dy: float,
     dx0: float = 0.0,
     row_start_parity: int = 0,
-    clean: bool = True,
+    clean: bool = False,
+    force_union: bool = False,
 ) -> cq.Workplane:
     """
-    nrows rows fused (union) into one solid, with stagger.
+    nrows rows with stagger; fused (union) into one solid only if the cells
+    overlap or force_union=True, otherwise the unfused cell compound.
 
     row_start_parity:
         0 -> first row has x_off = 0
         1 -> first row has x_off = dx0
+    clean:
+        Clean the fused solid. Off by default; clean the final shape once
+        (finalize() or export_step(clean=True)) instead.
+    force_union:
+        If False and the cells cannot overlap (cell AABB fits into dx x dy),
+        the fuse is skipped and the cell compound is returned as is.
+        Set True when touching cells must share faces in one solid.
     """
     if not isinstance(cube, cq.Workplane):
         raise TypeError("cube must be cadquery.Workplane")
@@ -66,34 +240,24 @@ def make_nrow_union(
     if row_start_parity not in (0, 1):
         raise ValueError("row_start_parity must be 0 or 1")
 
+    # same placement path as make_nrow_compound (no cq.Vector/cq.Location per cell)
     base = cube.val()
-    solids: List[cq.Shape] = []
-
-    for r in range(nrows):
-        y = r * dy
-        x_off = dx0 if ((row_start_parity + r) & 1) else 0.0
+    cells = _make_nrow_compound_fast(base, nx, nrows, dx, dy, dx0, row_start_parity)
 
-        for i in range(nx):
-            x = i * dx + x_off
-            solids.append(base.moved(cq.Location(cq.Vector(x, y, 0.0))))
+    # Cells within a row are dx apart and rows dy apart, so if the cell AABB
+    # fits into dx x dy no two cells overlap (at most touch) and the fuse can glue
+    bb = bbox_of(base)
+    glue = bb.xlen <= dx and bb.ylen <= dy
+    if glue and not force_union:
+        return cells
 
-    wp = cq.Workplane("XY").newObject(solids)
-
-    # Single multi-boolean fuse (fastest reliable)
-    wp = wp.union()
-
-    if clean:
-        wp = wp.clean()
-
-    return wp
+    # Single multi-argument fuse + one cleanup pass (see union_many)
+    solids: List[cq.Shape] = cells.val().Solids()
+    return union_many([cq.Workplane("XY").newObject(solids)], clean=clean, glue=glue)
 
 def make_pattern_assembly(
     cube: cq.Workplane,
-    nx: int,
-    ny: int,
-    dx: float,
-    dy: float,
-    dx0: float = 0.0,
+    pattern: PatternParams,
     block_rows: int = 4,
 ) -> cq.Assembly:
     """
@@ -101,30 +265,34 @@ def make_pattern_assembly(
 
     Performance characteristics:
       - builds at most 3 compounds total:
-          block_even, block_odd, tail(optional)
+          block_even, block_odd (only if block_rows is odd), tail(optional)
       - instances those compounds (cheap)
     """
     if not isinstance(cube, cq.Workplane):
         raise TypeError("cube must be cadquery.Workplane")
-    if nx <= 0 or ny <= 0:
-        raise ValueError("nx and ny must be > 0")
-    if dx <= 0 or dy <= 0:
-        raise ValueError("dx and dy must be > 0")
+    if not isinstance(pattern, PatternParams):
+        raise TypeError("pattern must be PatternParams")
+    nx, ny, dx, dy, dx0 = pattern.nx, pattern.ny, pattern.dx, pattern.dy, pattern.dx0
     if not (1 <= block_rows < ny):
         raise ValueError("block_rows must satisfy 1 <= block_rows < ny")
 
     assy = cq.Assembly(name="pattern")
+    base = cube.val()  # resolved once for every prototype below
 
     full_blocks = ny // block_rows
     rem = ny % block_rows
 
-    # Build reusable prototypes ONCE (only two parities exist)
-    block_even = make_nrow_compound(
-        cube=cube, nx=nx, nrows=block_rows, dx=dx, dy=dy, dx0=dx0, row_start_parity=0
-    )
-    block_odd = make_nrow_compound(
-        cube=cube, nx=nx, nrows=block_rows, dx=dx, dy=dy, dx0=dx0, row_start_parity=1
-    )
+    # start_row parity of every block, computed once
+    odd_start = ((np.arange(full_blocks) * block_rows) & 1).astype(bool).tolist()
+
+    # Build reusable prototypes ONCE (only two parities exist; with an even
+    # block_rows every block starts on an even row and block_odd is never used).
+    # Built serially on purpose: each is a BRep_Builder loop of moved copies
+    # (~1 ms for 50x5 cells), far below process-pool startup plus pickling.
+    block_even = _make_nrow_compound_fast(base, nx, block_rows, dx, dy, dx0, 0)
+    block_odd = None
+    if any(odd_start):
+        block_odd = _make_nrow_compound_fast(base, nx, block_rows, dx, dy, dx0, 1)
 
     # Instance blocks
     for b in range(full_blocks):
@@ -132,12 +300,12 @@ def make_pattern_assembly(
         y_off = start_row * dy
 
         # Choose correct prototype based on start_row parity
-        block = block_odd if (start_row & 1) else block_even
+        block = block_odd if odd_start[b] else block_even
 
         assy.add(
             block,
             name=f"block_{b}",
-            loc=cq.Location(cq.Vector(0.0, y_off, 0.0)),
+            loc=_y_shift_loc(y_off),
         )
 
     # Tail built once (if needed), with correct start parity
@@ -145,68 +313,142 @@ def make_pattern_assembly(
         start_row = full_blocks * block_rows
         parity = start_row & 1
 
-        tail = make_nrow_compound(
-            cube=cube, nx=nx, nrows=rem, dx=dx, dy=dy, dx0=dx0, row_start_parity=parity
-        )
+        tail = _make_nrow_compound_fast(base, nx, rem, dx, dy, dx0, parity)
 
         assy.add(
             tail,
             name="tail",
-            loc=cq.Location(cq.Vector(0.0, start_row * dy, 0.0)),
+            loc=_y_shift_loc(start_row * dy),
         )
+
+    # every instance is an XY translation of the prototype -> the bbox is known
+    assy.metadata["pattern_bbox"] = _pattern_bound_box(base, pattern)
+    _record_bbox(assy, assy.metadata["pattern_bbox"])
     return assy
 
-def assembly_zmin(assy: cq.Assembly) -> float:
+def make_cell_assembly(
+    cube: cq.Workplane,
+    pattern: PatternParams,
+) -> cq.Assembly:
     """
-    Minimum Z of all geometry in an Assembly (robust across CQ versions).
+    Assembly with one instance per cube, all referencing the same prototype.
+
+    No geometry is moved or copied: every child points at `cube` with its own
+    cq.Location, so the STEP assembly exporter (export_step) writes the cube
+    BRep once plus nx*ny placements.
+    """
+    if not isinstance(cube, cq.Workplane):
+        raise TypeError("cube must be cadquery.Workplane")
+    if not isinstance(pattern, PatternParams):
+        raise TypeError("pattern must be PatternParams")
+
+    assy = cq.Assembly(name="pattern_cells")
+    xs, ys = _grid_xy(pattern.nx, pattern.ny, pattern.dx, pattern.dy, pattern.dx0)
+    # row and column index of every cell, row-major like xs/ys
+    rows, cols = np.divmod(np.arange(xs.size), pattern.nx)
+
+    # Locations straight from a gp_Trsf (no cq.Vector per cell)
+    trsf = gp_Trsf()
+    set_translation = trsf.SetTranslation
+    add = assy.add
+    for i, j, x, y in zip(cols.tolist(), rows.tolist(), xs.tolist(), ys.tolist()):
+        set_translation(gp_Vec(x, y, 0.0))
+        add(cube, name=f"c_{i}_{j}", loc=cq.Location(TopLoc_Location(trsf)))
+
+    assy.metadata["pattern_bbox"] = _pattern_bound_box(cube.val(), pattern)
+    _record_bbox(assy, assy.metadata["pattern_bbox"])
+    return assy
+
+def _pattern_bound_box(base: cq.Shape, pattern: PatternParams) -> cq.BoundBox:
+    """AABB of all cells: prototype AABB swept over the cell-center bounds."""
+    base_bb = bbox_of(base)
+    bb = pattern.bbox
+    return _make_bound_box(
+        bb.xmin + base_bb.xmin, bb.xmax + base_bb.xmax,
+        bb.ymin + base_bb.ymin, bb.ymax + base_bb.ymax,
+        base_bb.zmin, base_bb.zmax,
+    )
+
+def _record_bbox(assy: cq.Assembly, bb: cq.BoundBox) -> None:
+    """
+    Store bb as the assembly bbox together with the current child count, so
+    a later assy.add() from outside the builders invalidates it.
+    """
+    assy.metadata["bbox"] = bb
+    assy.metadata["bbox_children"] = len(assy.children)
+
+def _recorded_bbox(assy: cq.Assembly) -> cq.BoundBox | None:
+    """The recorded assembly bbox, or None if missing or stale."""
+    bb = assy.metadata.get("bbox")
+    if bb is None or assy.metadata.get("bbox_children") != len(assy.children):
+        return None
+    return bb
+
+def assembly_bbox(assy: cq.Assembly) -> cq.BoundBox:
+    """
+    Bounding box of all geometry in an Assembly.
+
+    Uses assy.metadata["bbox"] when the builders recorded it (pattern builders,
+    add_substrate, add_frame_around_pattern keep it up to date) and no child
+    was added since; otherwise falls back to flattening the assembly with
+    toCompound().
     """
     if not isinstance(assy, cq.Assembly):
         raise TypeError("assy must be cadquery.Assembly")
 
+    bb = _recorded_bbox(assy)
+    if bb is not None:
+        return bb
+
     # CQ Assembly can be converted to a single compound shape with all locations applied
-    comp = assy.toCompound()
-    bb = comp.BoundingBox()
-    return bb.zmin
+    return assy.toCompound().BoundingBox()
+
+def assembly_zmin(assy: cq.Assembly) -> float:
+    """
+    Minimum Z of all geometry in an Assembly (robust across CQ versions).
+    See assembly_bbox().
+    """
+    return assembly_bbox(assy).zmin
 
 def add_substrate(
     assy: cq.Assembly,
     thickness: float,
     margin: float,
-    nx: int,
-    ny: int,
-    dx: float,
-    dy: float,
-    dx0: float,
+    pattern: PatternParams,
     edge_length_mm: float,
+    pattern_bbox: cq.BoundBox | None = None,
 ) -> cq.Assembly:
+    """
+    Substrate slab under the pattern, its top at the pattern zmin.
 
-    z_top = assembly_zmin(assy)  # <- automatic contact plane
-
-    # placement bounds in XY (centers)
-    x_min = 0.0
-    x_max = (nx - 1) * dx
-    if ny >= 2:
-        x_min = min(x_min, dx0)
-        x_max = max(x_max, (nx - 1) * dx + dx0)
-
-    y_min = 0.0
-    y_max = (ny - 1) * dy
-
-    half = 0.5 * edge_length_mm
-    x_min -= (half + margin)
-    x_max += (half + margin)
-    y_min -= (half + margin)
-    y_max += (half + margin)
-
-    size_x = x_max - x_min
-    size_y = y_max - y_min
-    cx = 0.5 * (x_min + x_max)
-    cy = 0.5 * (y_min + y_max)
-
-    cz = z_top - thickness / 2.0
-    substrate = generate_rectangle(size_x, size_y, thickness).translate((cx, cy, cz))
+    pattern_bbox (or assy.metadata["pattern_bbox"], recorded by the pattern
+    builders) gives that zmin directly; otherwise it is read from the assembly.
+    """
+    if pattern_bbox is None:
+        pattern_bbox = assy.metadata.get("pattern_bbox")
+    if pattern_bbox is not None:
+        z_top = pattern_bbox.zmin
+    else:
+        z_top = assembly_zmin(assy)  # <- automatic contact plane
+
+    # placement bounds in XY (centers) + half a cube + margin
+    bb = pattern.bbox
+    grow = 0.5 * edge_length_mm + margin
+    x_min = bb.xmin - grow
+    x_max = bb.xmax + grow
+    y_min = bb.ymin - grow
+    y_max = bb.ymax + grow
+
+    substrate = cq.Workplane("XY").newObject(
+        [_make_aabb_box(x_min, x_max, y_min, y_max, z_top - thickness, z_top)]
+    )
 
-    assy.add(substrate, name="substrate", loc=cq.Location())
+    bb_assy = _recorded_bbox(assy)
+    assy.add(substrate, name="substrate", loc=_IDENTITY_LOC)
+    if bb_assy is not None:
+        _record_bbox(assy, bb_assy.add(
+            _make_bound_box(x_min, x_max, y_min, y_max, z_top - thickness, z_top)
+        ))
     return assy
 
 
@@ -214,15 +456,12 @@ def add_frame_around_pattern(
     assy: cq.Assembly,
     substrate_thickness: float,
     margin: float,
-    nx: int,
-    ny: int,
-    dx: float,
-    dy: float,
-    dx0: float,
+    pattern: PatternParams,
     edge_length_mm: float,
     clearance: float = 0.0,
     name: str = "frame",
-    clean: bool = True,
+    clean: bool = False,
+    pattern_bbox: cq.BoundBox | None = None,
 ) -> cq.Assembly:
     """
     Add a rectangular frame (ring) around the pattern.
@@ -236,7 +475,7 @@ def add_frame_around_pattern(
       - You already added the substrate with `substrate_thickness` such that:
             substrate top == pattern zmin
         (this matches your add_substrate() implementation).
-      - Pattern XY placement follows your nx/ny/dx/dy/dx0 logic and cubes are centered at their placement points.
+      - Pattern XY placement follows `pattern` (PatternParams) and cubes are centered at their placement points.
 
     Parameters
     ----------
@@ -246,6 +485,13 @@ def add_frame_around_pattern(
         The same margin used for the substrate. This becomes the frame wall thickness in XY.
     clearance : float
         Extra clearance added to the inner opening (positive -> larger opening).
+    clean : bool
+        Merge the four wall boxes into one ring solid. Off by default: the
+        frame is then a compound of the four walls (no boolean at all).
+    pattern_bbox : cq.BoundBox | None
+        Bounds of the pattern alone. Defaults to assy.metadata["pattern_bbox"];
+        if neither is available, the pattern z range is inferred from the
+        assembly bounds and substrate_thickness.
     """
     if not isinstance(assy, cq.Assembly):
         raise TypeError("assy must be cadquery.Assembly")
@@ -253,33 +499,31 @@ def add_frame_around_pattern(
         raise ValueError("substrate_thickness must be > 0")
     if margin < 0 or clearance < 0:
         raise ValueError("margin and clearance must be >= 0")
-    if nx <= 0 or ny <= 0:
-        raise ValueError("nx and ny must be > 0")
-    if dx <= 0 or dy <= 0:
-        raise ValueError("dx and dy must be > 0")
+    if not isinstance(pattern, PatternParams):
+        raise TypeError("pattern must be PatternParams")
     if edge_length_mm <= 0:
         raise ValueError("edge_length_mm must be > 0")
 
-    # --- Z placement: get total bounds of assembly (pattern + substrate + anything already in it) ---
-    bb_all = assy.toCompound().BoundingBox()
-
-    # With your substrate construction, pattern zmin == substrate top == assembly_zmin + substrate_thickness
-    z_pattern_min = bb_all.zmin + substrate_thickness
-    z_pattern_max = bb_all.zmax
+    # --- Z placement: pattern z range, known from the builders when recorded ---
+    if pattern_bbox is None:
+        pattern_bbox = assy.metadata.get("pattern_bbox")
+    if pattern_bbox is not None:
+        z_pattern_min = pattern_bbox.zmin
+        z_pattern_max = pattern_bbox.zmax
+    else:
+        # total bounds of assembly (pattern + substrate + anything already in it);
+        # with your substrate construction, pattern zmin == substrate top == assembly_zmin + substrate_thickness
+        bb_all = assembly_bbox(assy)
+        z_pattern_min = bb_all.zmin + substrate_thickness
+        z_pattern_max = bb_all.zmax
     frame_h = z_pattern_max - z_pattern_min
     if frame_h <= 0:
         raise ValueError("Computed frame height <= 0. Check that the assembly contains the pattern above the substrate.")
 
     # --- XY bounds: compute substrate outer size (same as add_substrate) ---
     # placement bounds in XY (centers)
-    x_min = 0.0
-    x_max = (nx - 1) * dx
-    if ny >= 2:
-        x_min = min(x_min, dx0)
-        x_max = max(x_max, (nx - 1) * dx + dx0)
-
-    y_min = 0.0
-    y_max = (ny - 1) * dy
+    bb = pattern.bbox
+    x_min, x_max, y_min, y_max = bb.xmin, bb.xmax, bb.ymin, bb.ymax
 
     half = 0.5 * edge_length_mm
 
@@ -291,8 +535,6 @@ def add_frame_around_pattern(
 
     outer_x = x_max_out - x_min_out
     outer_y = y_max_out - y_min_out
-    cx = 0.5 * (x_min_out + x_max_out)
-    cy = 0.5 * (y_min_out + y_max_out)
 
     # inner opening: pattern footprint (cover full cubes) + optional clearance
     x_min_in = x_min - (half + clearance)
@@ -307,19 +549,26 @@ def add_frame_around_pattern(
     if inner_x >= outer_x or inner_y >= outer_y:
         raise ValueError("Inner opening is larger than outer frame. Reduce clearance or increase margin.")
 
-    # --- Build ring: outer box minus inner box ---
-    cz = z_pattern_min + frame_h / 2.0
+    # --- Build ring: four wall boxes, no boolean ---
+    # left/right walls span the full outer y range, bottom/top fill the gap between them
+    z0, z1 = z_pattern_min, z_pattern_max
+    walls = [
+        _make_aabb_box(x_min_out, x_min_in, y_min_out, y_max_out, z0, z1),
+        _make_aabb_box(x_max_in, x_max_out, y_min_out, y_max_out, z0, z1),
+        _make_aabb_box(x_min_in, x_max_in, y_min_out, y_min_in, z0, z1),
+        _make_aabb_box(x_min_in, x_max_in, y_max_in, y_max_out, z0, z1),
+    ]
 
-    outer = generate_rectangle(outer_x, outer_y, frame_h).translate((cx, cy, cz))
-
-    # make inner cutter slightly taller to guarantee a clean through-cut
-    inner = generate_rectangle(inner_x, inner_y, frame_h + 0.5).translate((0.5 * (x_min_in + x_max_in),
-                                                                          0.5 * (y_min_in + y_max_in),
-                                                                          cz))
-
-    frame = outer.cut(inner)
     if clean:
-        frame = frame.clean()
-
-    assy.add(frame, name=name, loc=cq.Location())
+        # walls only touch, so a glued fuse merges them into one ring solid
+        frame = union_many([cq.Workplane("XY").newObject(walls)], clean=True, glue=True)
+    else:
+        frame = cq.Workplane("XY").newObject([cq.Compound.makeCompound(walls)])
+
+    bb_assy = _recorded_bbox(assy)
+    assy.add(frame, name=name, loc=_IDENTITY_LOC)
+    if bb_assy is not None:
+        _record_bbox(assy, bb_assy.add(
+            _make_bound_box(x_min_out, x_max_out, y_min_out, y_max_out, z_pattern_min, z_pattern_max)
+        ))
     return assy
\ No newline at end of file
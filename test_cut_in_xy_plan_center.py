@@ -46,4 +46,11 @@ cube_rot = rotate_hexagonal_cube_corner(cube)
 cube_rot_cut = cut_at_z_plane_from_top(cube_rot, z_plane=-scale_f * 0.5 * math.sin(math.radians(alpha_deg))*face_diagonal_mm, keep="bottom")
 #math.sin(math.radians(alpha_deg-45))*0.5*edge_face_diagonal_mm
 
-export_step(cube_rot_cut, "output/test_cut.step")
\ No newline at end of file
+export_step(cube_rot_cut, "output/test_cut.step")
+
+# planes beyond the solid on the kept side must give an empty result
+# (the halfspace box has to stay on the far side of the plane)
+for keep, z_offset in (("top", 5.0), ("bottom", -5.0)):
+    out_of_range = cut_in_xy_plane_center(cube_rot, keep=keep, z_offset=z_offset)
+    volume = sum(s.Volume() for s in out_of_range.vals())
+    assert volume < 1e-12, f"keep={keep!r}, z_offset={z_offset}: expected empty result, got volume {volume}"